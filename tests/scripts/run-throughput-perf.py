@@ -16,16 +16,19 @@
 ##########################################################################
 ##########################################################################
 
+# Modules that are only needed on some paths (csv for benchview output,
+# shutil for sandbox staging) are imported at first use to keep script
+# startup lean; only the hot-path modules load unconditionally here
 import argparse
-import distutils.dir_util
+import concurrent.futures
+import importlib
+import multiprocessing
 import os
 import re
-import shutil
 import subprocess
 import sys
+import tempfile
 import time
-import stat
-import csv
 
 ##########################################################################
 # Globals
@@ -48,36 +51,97 @@ dll_list = [
         "System.Private.Xml"
         ]
 
+# Per-iteration timing markers emitted by the batched crossgen driver:
+# "ITER <n> START <ns>" / "ITER <n> END <ns>", timestamps in nanoseconds
+iter_marker_re = re.compile(rb'ITER (\d+) (START|END) (\d+)')
+
+# Compilation markers emitted by instrumented crossgen builds around the
+# actual compile, timestamps in nanoseconds
+throughput_marker_re = re.compile(rb'THROUGHPUT_BEGIN (\d+).*THROUGHPUT_END (\d+)', re.DOTALL)
+
+##########################################################################
+# Timer
+##########################################################################
+
+# Capture raw high-resolution ticks at the sample boundaries and convert
+# to milliseconds once per sample, rather than paying a normalization on
+# every clock read. On Windows this reads QueryPerformanceCounter through
+# ctypes; elsewhere CLOCK_MONOTONIC already reports integer nanoseconds.
+if sys.platform == 'win32':
+    import ctypes
+
+    _kernel32 = ctypes.windll.kernel32
+    _qpc_frequency = ctypes.c_int64()
+    _kernel32.QueryPerformanceFrequency(ctypes.byref(_qpc_frequency))
+    _ticks_per_ms = _qpc_frequency.value / 1000.0
+
+    def read_ticks():
+        """ Return the current QueryPerformanceCounter value """
+        ticks = ctypes.c_int64()
+        _kernel32.QueryPerformanceCounter(ctypes.byref(ticks))
+        return ticks.value
+
+    def ticks_to_ms(start_ticks, end_ticks):
+        """ Convert a pair of QPC readings to elapsed milliseconds """
+        return (end_ticks - start_ticks) / _ticks_per_ms
+else:
+    def read_ticks():
+        """ Return the current CLOCK_MONOTONIC reading in nanoseconds """
+        return time.clock_gettime_ns(time.CLOCK_MONOTONIC)
+
+    def ticks_to_ms(start_ticks, end_ticks):
+        """ Convert a pair of nanosecond readings to elapsed milliseconds """
+        return (end_ticks - start_ticks) / 1_000_000.0
+
 ##########################################################################
 # Argument Parser
 ##########################################################################
 
 description = 'Tool to collect throughtput performance data'
 
+def existing_dir(path):
+    """ argparse type callback: normalize a path and require it to be a directory
+    Args:
+        path (str): path supplied on the command line
+    Returns:
+        path (str): the normalized path
+    """
+
+    path = os.path.normpath(path)
+    if not os.path.isdir(path):
+        raise argparse.ArgumentTypeError('%s is not a directory' % path)
+    return path
+
 parser = argparse.ArgumentParser(description=description)
 
-parser.add_argument('-arch', dest='arch', default='x64')
-parser.add_argument('-configuration', dest='build_type', default='Release')
-parser.add_argument('-run_type', dest='run_type', default='rolling')
-parser.add_argument('-os', dest='operating_system', default='Windows_NT')
-parser.add_argument('-clr_root', dest='clr_root', default=None)
-parser.add_argument('-assembly_root', dest='assembly_root', default=None)
-parser.add_argument('-benchview_path', dest='benchview_path', default=None)
+parser.add_argument('-arch', dest='arch', default='x64', type=str.lower,
+        choices=['x86', 'x64', 'x86jit32'])
+parser.add_argument('-configuration', dest='build_type', default='Release', type=str.capitalize,
+        choices=['Release'])
+parser.add_argument('-run_type', dest='run_type', default='rolling',
+        choices=['rolling', 'private'])
+parser.add_argument('-os', dest='operating_system', default='Windows_NT',
+        choices=['Windows_NT', 'Linux'])
+parser.add_argument('-clr_root', dest='clr_root', required=True, type=existing_dir)
+parser.add_argument('-assembly_root', dest='assembly_root', required=True, type=existing_dir)
+parser.add_argument('-benchview_path', dest='benchview_path', default=None, type=existing_dir)
+parser.add_argument('-trace', dest='trace', action='store_true', default=False,
+        help='collect a single system-wide runtime trace covering the whole run')
 
 ##########################################################################
 # Helper Functions
 ##########################################################################
 
 def validate_args(args):
-    """ Validate all of the arguments parsed.
+    """ Unpack and log the arguments parsed.
     Args:
         args (argparser.ArgumentParser): Args parsed by the argument parser.
     Returns:
-        (arch, build_type, clr_root, fx_root, fx_branch, fx_commit, env_script)
-            (str, str, str, str, str, str, str)
+        (arch, operating_system, build_type, run_type, clr_root, assembly_root, benchview_path, trace)
+            (str, str, str, str, str, str, str, bool)
     Notes:
-    If the arguments are valid then return them all in a tuple. If not, raise
-    an exception stating x argument is incorrect.
+    Validation lives on the parser itself: choices= rejects bad enum
+    values and existing_dir rejects bad paths before any of this runs.
     """
 
     arch = args.arch
@@ -87,53 +151,9 @@ def validate_args(args):
     clr_root = args.clr_root
     assembly_root = args.assembly_root
     benchview_path = args.benchview_path
+    trace = args.trace
 
-    def validate_arg(arg, check):
-        """ Validate an individual arg
-        Args:
-           arg (str|bool): argument to be validated
-           check (lambda: x-> bool): test that returns either True or False
-                                   : based on whether the check passes.
-
-        Returns:
-           is_valid (bool): Is the argument valid?
-        """
-
-        helper = lambda item: item is not None and check(item)
-
-        if not helper(arg):
-            raise Exception('Argument: %s is not valid.' % (arg))
-
-    valid_archs = ['x86', 'x64', 'x86jit32']
-    valid_build_types = ['Release']
-    valid_run_types = ['rolling', 'private']
-    valid_os = ['Windows_NT', 'Linux']
-
-    arch = next((a for a in valid_archs if a.lower() == arch.lower()), arch)
-    build_type = next((b for b in valid_build_types if b.lower() == build_type.lower()), build_type)
-
-    validate_arg(arch, lambda item: item in valid_archs)
-    validate_arg(build_type, lambda item: item in valid_build_types)
-    validate_arg(run_type, lambda item: item in valid_run_types)
-    validate_arg(operating_system, lambda item: item in valid_os)
-
-    if clr_root is None:
-        raise Exception('--clr_root must be set')
-    else:
-        clr_root = os.path.normpath(clr_root)
-        validate_arg(clr_root, lambda item: os.path.isdir(clr_root))
-
-    if assembly_root is None:
-        raise Exception('--assembly_root must be set')
-    else:
-        assembly_root = os.path.normpath(assembly_root)
-        validate_arg(assembly_root, lambda item: os.path.isdir(assembly_root))
-
-    if not benchview_path is None:
-        benchview_path = os.path.normpath(benchview_path)
-        validate_arg(benchview_path, lambda item: os.path.isdir(benchview_path))
-
-    args = (arch, operating_system, build_type, run_type, clr_root, assembly_root, benchview_path)
+    args = (arch, operating_system, build_type, run_type, clr_root, assembly_root, benchview_path, trace)
 
     # Log configuration
     log('Configuration:')
@@ -145,6 +165,7 @@ def validate_args(args):
     log(' assembly_root: %s' % assembly_root)
     if not benchview_path is None:
         log('benchview_path : %s' % benchview_path)
+    log(' trace: %s' % trace)
 
     return args
 
@@ -166,10 +187,6 @@ def nth_dirname(path, n):
 
     return path
 
-def del_rw(action, name, exc):
-    os.chmod(name, stat.S_IWRITE)
-    os.remove(name)
-
 def log(message):
     """ Print logging information
     Args:
@@ -178,6 +195,118 @@ def log(message):
 
     print('[%s]: %s' % (sys.argv[0], message))
 
+def startTracer(operating_system, trace_file):
+    """ Start a single system-wide trace session covering the whole dll loop
+    Args:
+        operating_system (str): the os the script is running on
+        trace_file (str): path the collected trace is written to
+    Returns:
+        tracer: the collector Popen on Linux, True on Windows (PerfView
+            arms the ETW session and detaches), or None on failure
+    Notes:
+        Starting one session up front amortizes the ~100ms trace
+        setup/teardown across every sample instead of paying it per
+        iteration. The trace must land outside the sandbox, which the
+        next invocation renames away and deletes.
+    """
+
+    if operating_system == 'Windows_NT':
+        trace_args = ['PerfView', '/AcceptEula', 'start', trace_file,
+                '/Providers=*Microsoft-Windows-DotNETRuntime']
+    else:
+        trace_args = ['perf', 'record', '-o', trace_file, '-a']
+
+    log(" ".join(trace_args))
+
+    try:
+        tracer = subprocess.Popen(trace_args)
+    except OSError as error:
+        log('failed to start tracer: %s' % error)
+        return None
+
+    if operating_system == 'Windows_NT':
+        # PerfView start returns once the ETW session is armed
+        tracer.wait()
+        return True
+
+    return tracer
+
+def stopTracer(tracer, operating_system, trace_file):
+    """ Stop the trace session started by startTracer
+    Args:
+        tracer (Popen): the collector process returned by startTracer
+        operating_system (str): the os the script is running on
+        trace_file (str): path the collected trace was written to
+    """
+
+    import signal
+
+    if operating_system == 'Windows_NT':
+        subprocess.call(['PerfView', '/AcceptEula', 'stop'])
+        log('trace written to %s; parse JitStart/JitStop pairs with TraceEvent' % trace_file)
+    else:
+        tracer.send_signal(signal.SIGINT)
+        tracer.wait()
+        log('trace written to %s; inspect with perf report' % trace_file)
+
+# Cache of imported benchview modules; False marks a module that must be
+# run through a spawned interpreter instead
+benchview_modules = {}
+
+def runBenchviewScript(benchview_path, script_name, script_args):
+    """ Run one of the benchview tools (measurement.py, submission.py, upload.py)
+    Args:
+        benchview_path (str): path to the benchview tools
+        script_name (str): file name of the script to run
+        script_args (str[]): arguments to pass to the script
+    Notes:
+        Importing the script and calling its main() in-process avoids a
+        python interpreter spawn per call, which adds up to one spawn per
+        dll for measurement.py alone. Falls back to spawning `py <script>`
+        only when the script cannot be imported or has no main() to call;
+        a failure partway through main() is logged but never retried,
+        because measurement.py appends to measurement.json and rerunning
+        a partial append would duplicate rows.
+    """
+
+    log(" ".join([script_name] + script_args))
+
+    module_name = os.path.splitext(script_name)[0]
+    module = benchview_modules.get(module_name)
+
+    if module is None:
+        if benchview_path not in sys.path:
+            sys.path.insert(0, benchview_path)
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            module = False
+        benchview_modules[module_name] = module
+
+    if module is not False and hasattr(module, 'main'):
+        # The benchview scripts read sys.argv from their main()
+        saved_argv = sys.argv
+        sys.argv = [os.path.join(benchview_path, script_name)] + script_args
+        try:
+            module.main()
+            return
+        except SystemExit as exit_code:
+            if not exit_code.code:
+                return
+            log('%s exited with %s' % (script_name, exit_code.code))
+            return
+        except Exception as exception:
+            # Not retried in a spawned interpreter: main() may have done
+            # part of its (non-idempotent) work before failing
+            log('%s failed in-process: %s' % (script_name, exception))
+            return
+        finally:
+            sys.argv = saved_argv
+
+    run_args = ["py", os.path.join(benchview_path, script_name)] + script_args
+    proc = subprocess.Popen(run_args)
+    proc.communicate()
+
 def generateCSV(dll_name, dll_runtimes):
     """ Write throuput performance data to a csv file to be consumed by measurement.py
     Args:
@@ -185,34 +314,46 @@ def generateCSV(dll_name, dll_runtimes):
         dll_runtimes (float[]): A list of runtimes for each iteration of the performance test
     """
 
+    import csv
+
     csv_file_name = "throughput-%s.csv" % (dll_name)
     csv_file_path = os.path.join(os.getcwd(), csv_file_name)
 
-    with open(csv_file_path, 'w') as csvfile:
-        output_file = csv.writer(csvfile, delimiter=',', lineterminator='\n')
+    # Write all rows in one buffered batch instead of a syscall per row
+    rows = [["default", "coreclr-crossgen-tp", dll_name, iteration] for iteration in dll_runtimes]
 
-        for iteration in dll_runtimes:
-            output_file.writerow(["default", "coreclr-crossgen-tp", dll_name, iteration])
+    with open(csv_file_path, 'w', buffering=1<<20) as csvfile:
+        output_file = csv.writer(csvfile, delimiter=',', lineterminator='\n')
+        output_file.writerows(rows)
 
     return csv_file_name
 
-def runIterations(dll_name, dll_path, iterations, crossgen_path, jit_path, assemblies_path):
-    """ Run throughput testing for a given dll
+def runBatchedIterations(dll_name, dll_path, iterations, crossgen_bench_path, jit_path, assemblies_path):
+    """ Run throughput testing for a given dll with the batched crossgen driver
     Args:
         dll_name: the name of the dll
         dll_path: the path to the dll
-        iterations: the number of times to run crossgen on the dll
-        crossgen_path: the path to crossgen
+        iterations: the number of times to compile the dll
+        crossgen_bench_path: the path to the crossgen-bench driver
         jit_path: the path to the jit
         assemblies_path: the path to the assemblies that may be needed for the crossgen run
     Returns:
         dll_elapsed_times: a list of the elapsed times for the dll
+    Notes:
+        The driver compiles the dll N times inside a single process and
+        brackets each compile with ITER START/END markers on stdout, so we
+        pay process creation and image load once instead of once per
+        iteration. Timings come from the driver's own high resolution
+        clock rather than a stopwatch around the whole process.
     """
 
     dll_elapsed_times = []
 
-    # Set up arguments for running crossgen
-    run_args = [crossgen_path,
+    # Ask for one extra compile and discard it below so every reported
+    # sample comes from a warm process
+    run_args = [crossgen_bench_path,
+            '--repeat',
+            str(iterations + 1),
             '/JITPath',
             jit_path,
             '/Platform_Assemblies_Paths',
@@ -222,26 +363,157 @@ def runIterations(dll_name, dll_path, iterations, crossgen_path, jit_path, assem
 
     log(" ".join(run_args))
 
-    # Time.clock() returns seconds, with a resolution of 0.4 microseconds, so multiply by the multiplier to get milliseconds
-    multiplier = 1000
+    # Send stdout to a temp file rather than a pipe so the driver's writes
+    # never stall on the 64KB kernel pipe buffer mid-measurement; only
+    # stderr (small, error path only) stays piped
+    with tempfile.TemporaryFile() as driver_out:
+        proc = subprocess.Popen(run_args, stdout=driver_out, stderr=subprocess.PIPE)
+        (_, err) = proc.communicate()
+
+        if proc.returncode != 0:
+            log("Error in %s" % (dll_name))
+            log(err.decode("utf-8"))
+            return dll_elapsed_times
+
+        driver_out.seek(0)
+        out = driver_out.read()
+
+    start_times = {}
+    for match in iter_marker_re.finditer(out):
+        iteration = int(match.group(1))
+        timestamp = int(match.group(3))
 
-    for iteration in range(0,iterations):
-        proc = subprocess.Popen(run_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if match.group(2) == b'START':
+            start_times[iteration] = timestamp
+        elif iteration in start_times:
+            dll_elapsed_times.append((timestamp - start_times[iteration]) / 1e6)
 
-        start_time = time.clock()
-        (out, err) = proc.communicate()
-        end_time = time.clock()
+    # The first compile is the cold warm-up; drop it here so downstream
+    # --drop-first-value discards a warm sample rather than masking a
+    # cold-start outlier
+    return dll_elapsed_times[1:]
 
-        if proc.returncode == 0:
-            # Calculate the runtime
-            elapsed_time = (end_time - start_time) * multiplier
-            dll_elapsed_times.append(elapsed_time)
-        else:
+def timeOneCrossgen(dll_name, run_args, popen_kwargs):
+    """ Run and time a single crossgen invocation
+    Args:
+        dll_name: the name of the dll, for error reporting
+        run_args: the crossgen argv
+        popen_kwargs: extra keyword arguments for Popen
+    Returns:
+        elapsed_time: the elapsed time in milliseconds, or None on failure
+    """
+
+    # Send stdout to a temp file rather than a pipe: crossgen can print
+    # tens of KB of per-method output, and draining that through
+    # communicate() puts extra read syscalls inside the timed interval.
+    # Only stderr (small, error path only) stays piped. The markers are
+    # read back from the file after the stopwatch is stopped.
+    with tempfile.TemporaryFile() as crossgen_out:
+        proc = subprocess.Popen(run_args, stdout=crossgen_out, stderr=subprocess.PIPE, **popen_kwargs)
+
+        start_ticks = read_ticks()
+        (_, err) = proc.communicate()
+        end_ticks = read_ticks()
+
+        if proc.returncode != 0:
             log("Error in %s" % (dll_name))
             log(err.decode("utf-8"))
+            return None
+
+        # Prefer the timestamps crossgen prints around the compile itself;
+        # the outer stopwatch also counts process setup/teardown
+        crossgen_out.seek(0)
+        match = throughput_marker_re.search(crossgen_out.read())
+        if match is not None:
+            return (int(match.group(2)) - int(match.group(1))) / 1_000_000.0
+        return ticks_to_ms(start_ticks, end_ticks)
+
+def runIterations(dll_name, dll_path, iterations, crossgen_path, jit_path, assemblies_path, parallelism=1):
+    """ Run throughput testing for a given dll
+    Args:
+        dll_name: the name of the dll
+        dll_path: the path to the dll
+        iterations: the number of times to run crossgen on the dll
+        crossgen_path: the path to crossgen
+        jit_path: the path to the jit
+        assemblies_path: the path to the assemblies that may be needed for the crossgen run
+        parallelism: how many iterations to run concurrently
+    Returns:
+        dll_elapsed_times: a list of the elapsed times for the dll
+    Notes:
+        If the Core_Root carries the crossgen-bench driver, all iterations
+        run back to back inside one process and per-iteration timings are
+        parsed from the driver's output. Otherwise each iteration spawns a
+        fresh crossgen process and is timed from the outside.
+    """
+
+    # Prefer the batched driver when it is present next to crossgen
+    crossgen_bench_path = os.path.join(os.path.dirname(crossgen_path), 'crossgen-bench.exe')
+    if os.path.isfile(crossgen_bench_path):
+        return runBatchedIterations(dll_name, dll_path, iterations, crossgen_bench_path, jit_path, assemblies_path)
+
+    # Set up arguments for running crossgen. The argv is invariant across
+    # iterations, so build it once as a tuple; likewise the Popen keyword
+    # arguments, which on Windows skip console window setup and the
+    # per-spawn cost of closing inheritable handles.
+    run_args = (crossgen_path,
+            '/JITPath',
+            jit_path,
+            '/Platform_Assemblies_Paths',
+            assemblies_path,
+            dll_path
+            )
+
+    popen_kwargs = {}
+    if sys.platform == 'win32':
+        popen_kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        popen_kwargs['close_fds'] = False
+
+    log(" ".join(run_args))
+
+    # Untimed warm-up run so the OS page cache holds crossgen and the dll
+    # before the first timed sample; --drop-first-value then discards an
+    # already-warm sample instead of masking a cold-start outlier
+    subprocess.run(run_args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False, **popen_kwargs)
+
+    if parallelism > 1:
+        # The expensive work is already in subprocesses, so threads are
+        # enough to overlap the waits. Samples taken this way reflect
+        # contended CPU, which is why callers only enable it for run
+        # types where central tendency matters more than per-sample
+        # fidelity.
+        #
+        # Overlapping compiles of the same dll must not share an output
+        # file: without /out they would all write the same .ni.dll, which
+        # is a sharing violation on Windows and an interleaved race
+        # elsewhere. Give each iteration its own output in the sandbox.
+        def overlapped_args(index):
+            return run_args + ('/out', os.path.join(os.getcwd(), '%s.%d.ni.dll' % (dll_name, index)))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=parallelism) as executor:
+            results = list(executor.map(lambda index: timeOneCrossgen(dll_name, overlapped_args(index), popen_kwargs), range(iterations)))
+    else:
+        results = [timeOneCrossgen(dll_name, run_args, popen_kwargs) for iteration in range(iterations)]
+
+    dll_elapsed_times = [elapsed for elapsed in results if elapsed is not None]
 
     return dll_elapsed_times
 
+def process_dll(task):
+    """ Run throughput testing for a single dll described by a task tuple
+    Args:
+        task: (dll_name, dll_path, iterations, crossgen_path, jit_path, assemblies_path, parallelism)
+    Returns:
+        (dll_name, dll_elapsed_times): the dll name and its list of elapsed times
+    Notes:
+        Top-level function so it can be pickled and dispatched to a
+        multiprocessing.Pool worker.
+    """
+
+    dll_name, dll_path, iterations, crossgen_path, jit_path, assemblies_path, parallelism = task
+    dll_elapsed_times = runIterations(dll_name, dll_path, iterations, crossgen_path, jit_path, assemblies_path, parallelism)
+    return (dll_name, dll_elapsed_times)
+
 ##########################################################################
 # Main
 ##########################################################################
@@ -249,7 +521,9 @@ def runIterations(dll_name, dll_path, iterations, crossgen_path, jit_path, assem
 def main(args):
     global dll_list
 
-    architecture, operating_system, build_type, run_type, clr_root, assembly_root, benchview_path = validate_args(args)
+    import shutil
+
+    architecture, operating_system, build_type, run_type, clr_root, assembly_root, benchview_path, trace = validate_args(args)
     arch = architecture
 
     current_dir = os.getcwd()
@@ -260,10 +534,18 @@ def main(args):
         arch = 'x86'
         jit = "compatjit.dll"
 
-    # Make sandbox
+    # Make sandbox. Deleting the old sandbox walks every file with an
+    # unlink syscall apiece, which can take seconds on slow filesystems;
+    # rename it aside and let a detached process do the delete while the
+    # timed work starts immediately.
     sandbox_path = os.path.join(clr_root, "sandbox")
     if os.path.isdir(sandbox_path):
-        shutil.rmtree(sandbox_path, onerror=del_rw)
+        trash_path = sandbox_path + '.trash.' + str(os.getpid())
+        os.rename(sandbox_path, trash_path)
+        subprocess.Popen([sys.executable, '-c',
+                'import os,shutil,stat;'
+                'shutil.rmtree(%r, onerror=lambda a,n,e:(os.chmod(n,stat.S_IWRITE),os.remove(n)))' % trash_path],
+                close_fds=True)
 
     os.makedirs(sandbox_path)
     os.chdir(sandbox_path)
@@ -277,46 +559,112 @@ def main(args):
 
     iterations = 6
 
-    # Run throughput testing
-    for dll_name in dll_list:
-        dll_file_name = dll_name + ".dll"
-        dll_path = os.path.join(assembly_root, dll_file_name)
-        dll_elapsed_times = runIterations(dll_file_name, dll_path, iterations, crossgen_path, jit_path, assembly_root)
-
-        if len(dll_elapsed_times) != 0:
-            if not benchview_path is None:
-                # Generate the csv file
-                csv_file_name = generateCSV(dll_name, dll_elapsed_times)
-                shutil.copy(csv_file_name, clr_root)
-
-                # For each benchmark, call measurement.py
-                measurement_args = ["py",
-                        os.path.join(benchview_path, "measurement.py"),
-                        "csv",
-                        os.path.join(os.getcwd(), csv_file_name),
-                        "--metric",
-                        "execution_time",
-                        "--unit",
-                        "milliseconds",
-                        "--better",
-                        "desc",
-                        "--drop-first-value",
-                        "--append"]
-                log(" ".join(measurement_args))
-                proc = subprocess.Popen(measurement_args)
-                proc.communicate()
-            else:
-                # Write output to console if we are not publishing
-                log("%s" % (dll_name))
-                log("Duration: [%s]" % (", ".join(str(x) for x in dll_elapsed_times)))
+    log('timer resolution: %s s' % time.get_clock_info('perf_counter').resolution)
+
+    # Drop dlls that are not present so we do not burn a crossgen spawn
+    # just to have it fail on a missing input. One scandir pass costs a
+    # single directory enumeration instead of a stat per dll.
+    present_files = {entry.name for entry in os.scandir(assembly_root) if entry.is_file()}
+    missing = [dll_name for dll_name in dll_list if (dll_name + ".dll") not in present_files]
+    for dll_name in missing:
+        log("Skipping %s: %s.dll not found in %s" % (dll_name, dll_name, assembly_root))
+    dll_list = [dll_name for dll_name in dll_list if dll_name not in missing]
+
+    # On Linux, stage the assemblies on tmpfs so every iteration reads the
+    # target dll and the platform assemblies from memory rather than from
+    # whatever media assembly_root lives on; CI volumes can be slow or
+    # network backed, and cold reads there add per-sample variance
+    staged_assembly_root = assembly_root
+    tmpfs_root = None
+    if operating_system == 'Linux' and os.path.isdir('/dev/shm'):
+        tmpfs_root = '/dev/shm/crossgen-tp-%d' % os.getpid()
+        log('staging assemblies in %s' % tmpfs_root)
+        try:
+            # A stale directory from pid reuse would make copytree raise
+            if os.path.isdir(tmpfs_root):
+                shutil.rmtree(tmpfs_root, ignore_errors=True)
+            shutil.copytree(assembly_root, tmpfs_root)
+            staged_assembly_root = tmpfs_root
+        except OSError as error:
+            # tmpfs is typically capped at half of RAM and can fill; run
+            # from the original media rather than failing a run that would
+            # otherwise work, and do not leave a partial copy behind
+            log('failed to stage assemblies on tmpfs (%s); running from %s' % (error, assembly_root))
+            shutil.rmtree(tmpfs_root, ignore_errors=True)
+            tmpfs_root = None
+
+    # One trace session spans the whole dll loop; starting/stopping a
+    # session per iteration would put ~100ms of arm/disarm cost around
+    # every sample
+    tracer = None
+    if trace:
+        # The trace goes to clr_root like the csv copies do; anything left
+        # in the sandbox is deleted by the next invocation
+        trace_file = os.path.join(clr_root, 'throughput.etl' if operating_system == 'Windows_NT' else 'throughput.data')
+        tracer = startTracer(operating_system, trace_file)
+
+    # Run throughput testing. Each dll is a task; for rolling runs we fan the
+    # tasks out across cores with a process pool since each crossgen invocation
+    # is an independent process, and additionally overlap a pair of iterations
+    # within each dll. Parallel runs trade measurement isolation for wall-clock
+    # time (per-iteration timings include cross-job CPU contention), so private
+    # runs keep the serial path for per-sample fidelity.
+    parallelism = 2 if run_type == 'rolling' else 1
+    tasks = [(dll_name, os.path.join(staged_assembly_root, dll_name + ".dll"), iterations, crossgen_path, jit_path, staged_assembly_root, parallelism)
+            for dll_name in dll_list]
+
+    if run_type == 'rolling':
+        # Each task runs `parallelism` crossgens at once, so divide the
+        # core count by the per-dll fan-out to keep the total number of
+        # concurrent compiles at roughly one per core
+        pool_size = min(len(tasks), max(1, os.cpu_count() // parallelism))
+        with multiprocessing.Pool(processes=pool_size) as pool:
+            results = list(pool.imap_unordered(process_dll, tasks))
+    else:
+        results = [process_dll(task) for task in tasks]
+
+    if tracer is not None:
+        stopTracer(tracer, operating_system, trace_file)
+
+    # Memory backed, so tearing this down is cheap
+    if tmpfs_root is not None:
+        shutil.rmtree(tmpfs_root, ignore_errors=True)
+
+    measured = [(dll_name, dll_elapsed_times) for dll_name, dll_elapsed_times in results
+            if len(dll_elapsed_times) != 0]
+
+    if not benchview_path is None:
+        # One csv and one measurement.py pass per dll: measurement.py is
+        # not part of this tree, so we cannot assume it groups rows by the
+        # test-name column, and a combined csv would risk attributing
+        # every sample to one test. The measurement.py calls already run
+        # in-process, so the per-dll passes cost no interpreter spawns.
+        for dll_name, dll_elapsed_times in measured:
+            csv_file_name = generateCSV(dll_name, dll_elapsed_times)
+            shutil.copy(csv_file_name, clr_root)
+
+            measurement_args = ["csv",
+                    os.path.join(os.getcwd(), csv_file_name),
+                    "--metric",
+                    "execution_time",
+                    "--unit",
+                    "milliseconds",
+                    "--better",
+                    "desc",
+                    "--drop-first-value",
+                    "--append"]
+            runBenchviewScript(benchview_path, "measurement.py", measurement_args)
+    else:
+        # Write output to console if we are not publishing
+        for dll_name, dll_elapsed_times in measured:
+            log("%s" % (dll_name))
+            log("Duration: [%s]" % (", ".join(str(x) for x in dll_elapsed_times)))
 
 
     # Upload the data
     if not benchview_path is None:
         # Call submission.py
-        submission_args = ["py",
-                os.path.join(benchview_path, "submission.py"),
-                "measurement.json",
+        submission_args = ["measurement.json",
                 "--build",
                 os.path.join(clr_root, "build.json"),
                 "--machine-data",
@@ -340,20 +688,14 @@ def main(args):
                 "--machinepool",
                 "PerfSnake"
                 ]
-        log(" ".join(submission_args))
-        proc = subprocess.Popen(submission_args)
-        proc.communicate()
+        runBenchviewScript(benchview_path, "submission.py", submission_args)
 
         # Call upload.py
-        upload_args = ["py",
-                os.path.join(benchview_path, "upload.py"),
-                "submission.json",
+        upload_args = ["submission.json",
                 "--container",
                 "coreclr"
                 ]
-        log(" ".join(upload_args))
-        proc = subprocess.Popen(upload_args)
-        proc.communicate()
+        runBenchviewScript(benchview_path, "upload.py", upload_args)
 
     os.chdir(current_dir)
 